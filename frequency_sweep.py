@@ -2,8 +2,17 @@
 
 '''
 AUTHOR: MICHAEL ZHOU
-CURRENT VERSION: 1.2
+CURRENT VERSION: 1.7
 MODIFICATION HISTORY:
+    1.7 Ported the spectrum analyzer center step sweep (pyvisa_freq_sweep.py, version 2: spectrum analyzer only),
+        the voltage protection and the biasing parameters of pyvisa_mixer_freq_sweep.py; the old scripts are retired
+    1.6 Output file names are parameters of the test functions (used by the run plans of sweep_runner.py),
+        pyvisa is only imported when the instruments are initialized
+    1.5 Added multi-product sweep to measure several mixer/multiplier products (harmonics, sidebands)
+        per frequency point with multiple markers (one acquisition per group of nearby products)
+    1.4 Added live result stream (shared memory ring buffer, see result_stream.py) for monitoring and plotting
+    1.3 Added frequency sweep with drift detection against the calibrated power and incremental
+        (local) Vg recalibration of the drifting frequencies
     1.2 Added fluctuation test function to detect fluctuation in power for certain frequency
     1.1 Added frequency sweep test function for testing objects
         Added functionality for screenshot and trace data capturing and saving 
@@ -11,9 +20,9 @@ MODIFICATION HISTORY:
 
     Version 0: Uses Spectrum Analyzer, Voltage Source and Signal Generator
     Version 1: Uses Spectrum Analyzer and Signal Generator for the frequency sweep
+    Version 2: Uses Spectrum Analyzer only (center frequency step sweep)
 '''
 
-import visa    #pyvisa library module is REQUIRED to run this program
 import datetime
 import time
 import sys
@@ -44,7 +53,12 @@ class FreqSweep():
         self.sa = None      #Spectrum Analyzer
         self.rm = None      #Resource Manager
 
+        self.stream = None  #Live result stream (optional, see start_live_stream)
+
         self.freq_volt = collections.defaultdict()  #Frequency to Vg mapping that optimizes output power
+        self.freq_pwr = collections.defaultdict()   #Frequency to maximum power found during calibration (expected power)
+        self.freq_recal_pwr = collections.defaultdict() #Frequency to power at the Vg confirmed by the latest incremental recalibration
+        self.vmap_file = 'freq_volt_map.csv'        #File storing the freq->volt map of the calibration
         self.num_step = int((freq_end - freq_start)/self.freq_step) + 1 #number of steps increment by 5GHz(step frequency) when in the frequency range
 
         #create a filepath for screenshot:
@@ -53,7 +67,15 @@ class FreqSweep():
 
         self.is_calibrated = False
 
+        #parameters for the incremental recalibration during frequency sweep:
+        self.drift_tolerance = 1.0  #dB, deviation from the expected power that flags a frequency as drifting
+        self.recal_volt_span = 3    #number of voltage steps searched on each side of the stored Vg
+        self.recal_volt_step = 0.01 #Volts
+
+        self.volt_protection = None #Volts, over voltage protection of the voltage source (None: left as it is)
+
     def initialize_instrument(self):
+        import visa    #pyvisa library module is REQUIRED to run this program (imported here so run plans can be checked without it)
         if self.version == 0:   #3 instruments
             try:
                 # Connect to the instrument
@@ -86,6 +108,9 @@ class FreqSweep():
             #set the output port to 2 (Vg port):
             self.vs.write('INST:SEL OUT2')
             #Set the voltage protection for voltage source:
+            if self.volt_protection is not None:
+                self.vs.write("VOLT:PROT:CLE")
+                self.vs.write("VOLT:PROT " + str(self.volt_protection) + "V")
 
             self.vs.write("VOLT 0")
             self.vs.write("OUTP ON")
@@ -120,15 +145,37 @@ class FreqSweep():
             print("Initialization Success. All instruments are connected!")
             return
 
-    def biasing_calibration(self):
-        ###########################################################################
-        #Parameters for the voltage source sweep to be changed HERE:
+        elif self.version == 2: #spectrum analyzer only
+            try:
+                # Connect to the instrument
+                self.rm = visa.ResourceManager()
+                list_res = self.rm.list_resources()
 
-        initial_voltage = 0.1 #Volts
-        volt_steps = 41  #steps to go up
-        volt_step = 0.01
-        
-        #Sweeping through this range of voltage: 50 mV to 500 mV, step: 10mV for each frequency
+                print("Resource list:")
+                print(list_res)
+
+                #automatically connects to the default resource (first detected)
+                if len(list_res) > 0:
+                    self.sa = self.rm.open_resource(list_res[0])      # Spectrum Analyzer
+                else:
+                    print('Error: Resources not found, please check connections.')
+                    sys.exit(1)
+            except:
+                print('Error connecting to the instrument!')
+                sys.exit(1)
+
+            if not self.sa:
+                print('Error occurred when connecting to the instrument!')
+                sys.exit(1)
+
+            print("Initialization Success. Spectrum analyzer is connected!")
+            return
+
+    def biasing_calibration(self, file_name = 'data_2_22_2019_260ghz_100-500mv.csv', initial_voltage = 0.1, volt_steps = 41, volt_step = 0.01):
+        ###########################################################################
+        #Parameters for the voltage source sweep (Volts, number of steps to go up, Volts):
+        #initial_voltage, volt_steps, volt_step
+        #Default: sweeping through 100 mV to 500 mV, step: 10mV for each frequency
         ###########################################################################
         
         #Initialize the spectrum analyzer to frequency to be measured:
@@ -154,10 +201,9 @@ class FreqSweep():
         volt_pwr = collections.defaultdict()
 
         time.sleep(2)
-        file_name = 'data_2_22_2019_260ghz_100-500mv.csv'
 
         #open the csv file and record the data
-        with open(file_name, 'wb') as csvfile:
+        with open(file_name, 'w', newline = '') as csvfile:
             csvwriter = csv.writer(csvfile, delimiter = ',', quotechar = '|')
             csvwriter.writerow(['FREQ','V_G','MEAS_PWR'])
 
@@ -195,6 +241,7 @@ class FreqSweep():
 
                     #write data to CSV:
                     csvwriter.writerow([curr_freq, "{0:.2f}".format(round(curr_volt, 2)), meas_pwr])
+                    self.publish_measurement(curr_freq, curr_volt, meas_pwr)
 
                     volt_pwr[curr_volt] = meas_pwr
                     curr_volt += volt_step
@@ -206,6 +253,8 @@ class FreqSweep():
                 max_volt = max(volt_pwr, key = volt_pwr.get)
                 self.freq_volt[curr_freq] = max_volt
                 max_pwr = max(volt_pwr.values())
+                self.freq_pwr[curr_freq] = max_pwr
+                self.freq_recal_pwr.pop(curr_freq, None)
                 print('Frequency: ' + str(curr_freq) + ', Maximum power voltage: ' + str(max_volt) + ', Maximum power: ' + str(max_pwr))
 
                 #increment frequency
@@ -226,7 +275,7 @@ class FreqSweep():
         self.write_vmap_to_csv(self.freq_volt)
         return  
     
-    def freq_sweep_test(self):
+    def freq_sweep_test(self, file_name = 'data_4_12_2019_140-160ghz_run_5_plexiglass.csv'):
         #Initialize the spectrum analyzer to frequency to be measured:
         self.sa.write(':FREQ:CENT '+ str(self.sa_cent_freq) + ' GHz')
         #Set the market to the center
@@ -245,10 +294,8 @@ class FreqSweep():
         self.sg.write(':FREQ:FIX ' + str(self.sweep_freq_start) + ' GHz')
         self.sg.write(':FREQ:STEP ' + str(self.sweep_freq_step) + ' GHz')
 
-        file_name = 'data_4_12_2019_140-160ghz_run_5_plexiglass.csv'      #change name here -> go to terminal -> up arrow -> hit enter
-
         #open the csv file and record the data
-        with open(file_name, 'wb') as csvfile:
+        with open(file_name, 'w', newline = '') as csvfile:
             csvwriter = csv.writer(csvfile, delimiter = ',', quotechar = '|')
             csvwriter.writerow(['FREQ','MEAS_PWR'])
 
@@ -275,10 +322,13 @@ class FreqSweep():
             
                 #store the peak power data to the CSV file:
                 csvwriter.writerow([curr_freq, meas_pwr])
+                self.publish_measurement(curr_freq, None, meas_pwr)
                 
                 if self.save_trace_data:
                     trace_data = self.get_trace_data()
-                    csvwriter.writerow(trace_data)
+                    if trace_data is not None:
+                        csvwriter.writerow(trace_data)
+                        self.publish_trace(curr_freq, trace_data)
                 
                 #increment frequency
                 if i + 1 == self.num_step:
@@ -290,7 +340,7 @@ class FreqSweep():
                 curr_freq += self.freq_step
                 curr_sweep_freq += self.sweep_freq_step
 
-    def fluctuation_test(self):
+    def fluctuation_test(self, file_name = "data_4_15_2019_65ghz_run_2_object4", num_meas = 500):
         #Initialize the spectrum analyzer to frequency to be measured:
         self.sa.write(':FREQ:CENT '+ str(self.sa_cent_freq) + ' GHz')
         #Set the market to the center
@@ -303,14 +353,13 @@ class FreqSweep():
         self.sa.write('AVER OFF')
         time.sleep(1)
 
-        file_name = "data_4_15_2019_65ghz_run_2_object4"
-        with open(file_name, 'w') as csvfile:
+        with open(file_name, 'w', newline = '') as csvfile:
             csvwriter = csv.writer(csvfile, delimiter = ',', quotechar = '|')
             csvwriter.writerow(['NUM', 'MEAS_POWER'])
 
             power_list = []
             meas_pwr = 0
-            for i in range(500):
+            for i in range(num_meas):
                 self.sa.write('CALC:MARK:CENT') 
                 time.sleep(0.5)
                 self.sa.write('CALC:MARK:Y?')
@@ -319,22 +368,332 @@ class FreqSweep():
                 print(meas_pwr)
                 power_list.append(meas_pwr)
                 csvwriter.writerow([i + 1, meas_pwr])
+                self.publish_measurement(self.freq_start, None, meas_pwr)
                 time.sleep(1.5)
             print("Fluctuation test done! Data stored in CSV successfully.")
             print(power_list)
         return
     
+    def frequency_sweep(self, incremental_recal = True, file_name = 'data_freq_sweep_recal.csv'):
+        #Sweeps the frequency range with the calibrated Vg for each frequency. The measured power is compared against
+        #the expected power from the calibration; frequencies drifting more than drift_tolerance are flagged and, if
+        #incremental_recal is set, Vg is re-optimized for that frequency only (the freq->volt map is updated in place).
+        #Drift is always measured against the power of biasing_calibration, recalibration does not change the reference.
+        #A drifting frequency is not searched again while its power still matches the power of its last recalibration
+        #(freq_recal_pwr): the Vg found then is still the optimum and only the gain of the device changed.
+        if self.vs is None:
+            print("ERROR: Frequency sweep requires the voltage source (version 0)! Please check instrument version and try again.")
+            sys.exit(1)
+
+        #loading the biasing calibration:
+        if not self.is_calibrated:
+            self.freq_volt = self.read_vmap_from_csv()
+        if not self.freq_volt:
+            print("ERROR: Reading frequency voltage mapping csv file failed! Please check biasing calibration and try again!")
+            sys.exit(1)
+        if not self.freq_pwr:
+            print("WARNING: No expected power in the frequency voltage mapping (map from before version 1.3?)! "
+                  "Drift detection and incremental recalibration are INACTIVE, rerun biasing calibration to enable them.")
+
+        #Initialize the spectrum analyzer to frequency to be measured (same averaging as the calibration):
+        self.sa.write(':FREQ:CENT '+ str(self.sa_cent_freq) + ' GHz')
+        #Set the market to the center
+        self.sa.write('CALC:MARK:CENT')
+        self.sa.write('AVER ON')
+        self.sa.write('AVER:COUN 10')
+
+        #Initialize the Signal Generator
+        curr_freq = self.freq_start
+        curr_sweep_freq = self.sweep_freq_start
+
+        self.sg.write(':FREQ:FIX ' + str(self.sweep_freq_start) + ' GHz')
+        self.sg.write(':FREQ:STEP ' + str(self.sweep_freq_step) + ' GHz')
+        time.sleep(2)
+
+        drifted_freq = []
+        unchecked_freq = []     #frequencies without expected power (no drift detection)
+
+        #open the csv file and record the data
+        with open(file_name, 'w', newline = '') as csvfile:
+            csvwriter = csv.writer(csvfile, delimiter = ',', quotechar = '|')
+            csvwriter.writerow(['FREQ', 'V_G', 'MEAS_PWR', 'EXP_PWR', 'DRIFT', 'RECAL_V_G', 'RECAL_PWR'])
+
+            for i in range(self.num_step):
+                if curr_freq not in self.freq_volt:
+                    print("ERROR: No calibrated voltage for frequency " + str(curr_freq) + "! Please check biasing calibration and try again!")
+                    self.vs.write('VOLT 0')
+                    sys.exit(1)
+
+                #Configure the voltage source to the calibrated voltage:
+                curr_volt = self.freq_volt[curr_freq]
+                if curr_volt > 0.65:
+                    print("Error: Voltage is too high when sweeping frequency! Please check voltage source and try again.")
+                    self.vs.write('VOLT 0')
+                    sys.exit(1)
+                self.vs.write('VOLT ' + str(curr_volt))
+                time.sleep(0.5)
+
+                meas_pwr = self.measure_power(25)
+                exp_pwr = self.freq_pwr.get(curr_freq)
+                drift = None if exp_pwr is None else meas_pwr - exp_pwr
+                if exp_pwr is None:
+                    unchecked_freq.append(curr_freq)
+                print('Current Frequency: ' + str(curr_freq) + ' V_G: ' + str(curr_volt) + ' Measured Power: ' + str(meas_pwr) + ' Expected Power: ' + str(exp_pwr))
+
+                recal_volt = ''
+                recal_pwr = ''
+                if drift is not None and abs(drift) > self.drift_tolerance:
+                    print('WARNING: Frequency ' + str(curr_freq) + ' drifted by ' + "{0:.2f}".format(drift) + ' dB from the calibration!')
+                    drifted_freq.append(curr_freq)
+                    last_recal_pwr = self.freq_recal_pwr.get(curr_freq)
+                    if last_recal_pwr is not None and abs(meas_pwr - last_recal_pwr) <= self.drift_tolerance:
+                        print('Frequency ' + str(curr_freq) + ' matches its last recalibration (' + str(last_recal_pwr) + '), V_G is kept.')
+                    elif incremental_recal:
+                        recal_volt, recal_pwr = self.recalibrate_point(curr_freq)
+
+                csvwriter.writerow([curr_freq, curr_volt, meas_pwr, exp_pwr, drift, recal_volt, recal_pwr])
+                self.publish_measurement(curr_freq, curr_volt, meas_pwr)
+
+                #increment frequency
+                if i + 1 == self.num_step:
+                    break
+
+                self.sg.write(':FREQ UP')
+                time.sleep(2)
+                self.sa.write('AVER:CLE')
+                curr_freq += self.freq_step
+                curr_sweep_freq += self.sweep_freq_step
+
+        #reset the voltage source
+        self.vs.write('VOLT 0')
+
+        print("Frequency sweep done! Drifting frequencies: " + str(drifted_freq))
+        if unchecked_freq:
+            print("WARNING: No expected power for frequencies " + str(unchecked_freq) + ", drift was NOT checked for them!")
+        if drifted_freq and incremental_recal:
+            #record the updated map to local csv file
+            self.write_vmap_to_csv(self.freq_volt)
+            print('Updated mapping of the voltage that produces highest power for each frequency (freq->volt)')
+            print(self.freq_volt)
+        return drifted_freq
+
+    def multi_product_sweep(self, products = None, span_margin = 0.01, group_span = 0.2, file_name = 'data_multi_product_sweep.csv'):
+        #Measures several mixing products at each frequency point with the markers of the spectrum analyzer.
+        #The products are measured in the same (IF) frequency domain as the other tests: the multiplier chain delivers
+        #RF = multiplier * f_sg and the LO is the test frequency, LO = RF - sa_cent_freq, so the product (k, n) is at
+        #|k * f_sg - n * LO| (k: harmonic of the signal generator, n: harmonic of the LO). See default_products.
+        #products (optional): list of (k, n) or (label, k, n) to measure instead of the default products.
+        #Products closer than group_span GHz are measured together from one acquisition with a narrow span around them
+        #(+ span_margin GHz), so that the resolution stays comparable to the single product tests. The span and the
+        #markers are restored when the sweep ends.
+        if products is None:
+            products = self.default_products()
+        if len(products) == 0 or len(products) > 12:
+            print("ERROR: Number of products has to be between 1 and 12 (number of spectrum analyzer markers)!")
+            sys.exit(1)
+        for p in products:
+            if not isinstance(p, (tuple, list)) or len(p) not in [2, 3]:
+                print("ERROR: Product " + str(p) + " has to be (k, n) or (label, k, n)! Please check the products and try again.")
+                sys.exit(1)
+        products = [tuple(p) if len(p) == 3 else (self.product_label(p[0], p[1]),) + tuple(p) for p in products]
+        labels = [label for label, k, n in products]
+
+        #remember the span of the spectrum analyzer to restore it afterwards
+        self.sa.write(':FREQ:SPAN?')
+        time.sleep(0.5)
+        prev_span = float(self.sa.read())
+
+        #set the number of averaging to be measured in the spectrum analyzer
+        self.sa.write('AVER ON')
+        time.sleep(0.5)
+        self.sa.write('AVER:COUN 50')
+
+        #Initialize the Signal Generator
+        curr_freq = self.freq_start
+        curr_sweep_freq = self.sweep_freq_start
+
+        self.sg.write(':FREQ:FIX ' + str(self.sweep_freq_start) + ' GHz')
+        self.sg.write(':FREQ:STEP ' + str(self.sweep_freq_step) + ' GHz')
+
+        num_markers = 1
+        try:
+            #open the csv file and record the data
+            with open(file_name, 'w', newline = '') as csvfile:
+                csvwriter = csv.writer(csvfile, delimiter = ',', quotechar = '|')
+                csvwriter.writerow(['FREQ', 'SWEEP_FREQ'] + labels)
+
+                for i in range(self.num_step):
+                    product_freqs = self.product_frequencies(curr_sweep_freq, products)
+                    meas_pwrs = [None] * len(products)
+
+                    for group in self.product_groups(product_freqs, group_span):
+                        #set a narrow span around the products of the group and put one marker on each of them:
+                        group_freqs = [product_freqs[j] for j in group]
+                        self.sa.write(':FREQ:STAR ' + str(max(min(group_freqs) - Decimal(str(span_margin)), 0)) + ' GHz')
+                        self.sa.write(':FREQ:STOP ' + str(max(group_freqs) + Decimal(str(span_margin))) + ' GHz')
+                        for m, product_freq in enumerate(group_freqs, 1):
+                            self.sa.write('CALC:MARK' + str(m) + ':MODE POS')
+                            self.sa.write('CALC:MARK' + str(m) + ':X ' + str(product_freq) + ' GHz')
+                        for m in range(len(group_freqs) + 1, num_markers + 1):
+                            self.sa.write('CALC:MARK' + str(m) + ':MODE OFF')
+                        num_markers = max(num_markers, len(group_freqs))
+
+                        #clearing the average first:
+                        self.sa.write('AVER:CLE')
+                        #wait for enough seconds to conduct the averaging on the instrument:
+                        time.sleep(110)
+
+                        #read the markers of the group from the same acquisition
+                        for m, j in enumerate(group, 1):
+                            self.sa.write('CALC:MARK' + str(m) + ':Y?')
+                            time.sleep(0.5)
+                            meas_pwrs[j] = float(self.sa.read())
+                            self.publish_measurement(curr_freq, None, meas_pwrs[j], j + 1)
+                    print('Current Frequency: ' + str(curr_freq) + ' Measured Power: ' + str(dict(zip(labels, meas_pwrs))))
+
+                    #store the screenshot to the assigned folder:
+                    if self.do_screenshot:
+                        screenshot_path = self.folder_path + str(curr_freq) + self.filetype
+                        self.save_screenshot(screenshot_path)
+
+                    csvwriter.writerow([curr_freq, curr_sweep_freq] + meas_pwrs)
+
+                    if self.save_trace_data:
+                        trace_data = self.get_trace_data()
+                        if trace_data is not None:
+                            csvwriter.writerow(trace_data)
+                            self.publish_trace(curr_freq, trace_data)
+
+                    #increment frequency
+                    if i + 1 == self.num_step:
+                        break
+
+                    self.sg.write(':FREQ UP')
+                    time.sleep(3)
+                    self.sa.write('AVER:CLE')
+                    curr_freq += self.freq_step
+                    curr_sweep_freq += self.sweep_freq_step
+        finally:
+            #restore the spectrum analyzer for the other tests: single marker at the center of the previous span
+            for m in range(2, num_markers + 1):
+                self.sa.write('CALC:MARK' + str(m) + ':MODE OFF')
+            self.sa.write(':FREQ:CENT ' + str(self.sa_cent_freq) + ' GHz')
+            self.sa.write(':FREQ:SPAN ' + str(prev_span) + ' Hz')
+            self.sa.write('CALC:MARK:CENT')
+        return
+
+    def product_groups(self, product_freqs, group_span):
+        #indices of the products grouped by frequency, the products of a group are within group_span GHz
+        groups = []
+        for j in sorted(range(len(product_freqs)), key = lambda j: product_freqs[j]):
+            if groups and product_freqs[j] - product_freqs[groups[-1][0]] <= Decimal(str(group_span)):
+                groups[-1].append(j)
+            else:
+                groups.append([j])
+        return groups
+
+    def default_products(self):
+        #(label, k, n) of the products measured by default, built from the multiplier chain:
+        #fundamental (IF at sa_cent_freq) and its 2nd and 3rd harmonic, and for a multiplier chain the
+        #products of the LO with the neighbouring harmonics of the signal generator (multiplier -/+ 1), i.e. the
+        #lower and upper sideband at f_sg - IF and f_sg + IF (leakage of the multiplier, not the image of the mixer).
+        m = self.multiplier
+        products = [('PWR_FUND', m, 1)]
+        if m > 1:
+            products += [('PWR_LSB', m - 1, 1), ('PWR_USB', m + 1, 1)]
+        products += [('PWR_H2', 2 * m, 2), ('PWR_H3', 3 * m, 3)]
+        return products
+
+    def product_frequencies(self, sweep_freq, products):
+        #frequencies (GHz) seen by the spectrum analyzer of the (label, k, n) products for the signal generator frequency sweep_freq
+        lo_freq = Decimal(self.multiplier) * Decimal(sweep_freq) - Decimal(str(self.sa_cent_freq))
+        return [abs(Decimal(k) * Decimal(sweep_freq) - Decimal(n) * lo_freq) for label, k, n in products]
+
+    def product_label(self, k, n):
+        #CSV column name of a product, e.g. PWR_K3_N1
+        return 'PWR_K' + str(k) + '_N' + str(n)
+
+    def recalibrate_point(self, curr_freq):
+        #Local search of Vg around the stored value for a single frequency (signal generator has to be on that frequency).
+        #The search window (+-recal_volt_span steps) moves on while the best voltage is at its edge, within the safe range,
+        #and the stored voltage is kept on ties. Updates the freq->volt map in place and returns the new voltage and power.
+        #The new power is stored in freq_recal_pwr, freq_pwr keeps the power of biasing_calibration so that drift is still
+        #measured against the original calibration.
+        stored_volt = round(float(self.freq_volt[curr_freq]), 2)
+        volt_pwr = collections.defaultdict()
+        best_key = lambda v: (volt_pwr[v], -abs(v - stored_volt))  #highest power, closest to the stored voltage on ties
+
+        center_volt = stored_volt
+        while True:
+            #Safety Procedure: only search inside the safe voltage range
+            window = [round(center_volt + j * self.recal_volt_step, 2) for j in range(-self.recal_volt_span, self.recal_volt_span + 1)]
+            window = [v for v in window if 0 < v <= 0.65]
+            for curr_volt in window:
+                if curr_volt in volt_pwr:
+                    continue
+                self.vs.write('VOLT ' + str(curr_volt))
+                time.sleep(0.5)
+                meas_pwr = self.measure_power(25)
+                print("{0:.2f}".format(curr_volt), meas_pwr)
+                self.publish_measurement(curr_freq, curr_volt, meas_pwr)
+                volt_pwr[curr_volt] = meas_pwr
+
+            #move the window if the best voltage is at its edge and the search can go further in that direction
+            best_volt = max(window, key = best_key)
+            if best_volt == window[0]:
+                next_volt = round(best_volt - self.recal_volt_step, 2)
+            elif best_volt == window[-1]:
+                next_volt = round(best_volt + self.recal_volt_step, 2)
+            else:
+                break
+            if not 0 < next_volt <= 0.65 or next_volt in volt_pwr:
+                break
+            center_volt = best_volt
+
+        max_volt = max(volt_pwr, key = best_key)
+        max_pwr = volt_pwr[max_volt]
+        self.freq_volt[curr_freq] = max_volt
+        self.freq_recal_pwr[curr_freq] = max_pwr
+        print('Recalibrated Frequency: ' + str(curr_freq) + ', Maximum power voltage: ' + str(stored_volt) + ' -> ' + str(max_volt) + ', Maximum power: ' + str(max_pwr))
+
+        #leave the voltage source at the new optimum
+        self.vs.write('VOLT ' + str(max_volt))
+        time.sleep(0.5)
+        return max_volt, max_pwr
+
+    def measure_power(self, aver_delay):
+        #clearing the average first and wait for enough seconds to conduct the averaging on the instrument:
+        self.sa.write('AVER:CLE')
+        time.sleep(aver_delay)
+        #measure the power at the center marker
+        self.sa.write('CALC:MARK:CENT') 
+        time.sleep(0.5)
+        self.sa.write('CALC:MARK:Y?')
+        time.sleep(0.5)
+        return float(self.sa.read())
+
     def write_vmap_to_csv(self, mydict):
-        with open('freq_volt_map.csv', 'w') as csv_file:
+        #rows: frequency, voltage, expected (calibrated) power, power of the last incremental recalibration
+        with open(self.vmap_file, 'w', newline = '') as csv_file:
             writer = csv.writer(csv_file)
             for key, value in mydict.items():
-                writer.writerow([key, value])
+                writer.writerow([key, value, self.freq_pwr.get(key, ''), self.freq_recal_pwr.get(key, '')])
     
     def read_vmap_from_csv(self):
+        #returns the freq->volt map and loads the expected and recalibration power (if recorded) into self.freq_pwr
+        #and self.freq_recal_pwr
         try:
-            with open('freq_volt_map.csv') as csv_file:
+            mydict = collections.defaultdict()
+            with open(self.vmap_file, newline = '') as csv_file:
                 reader = csv.reader(csv_file)
-                mydict = dict(reader)
+                for row in reader:
+                    if not row:
+                        continue
+                    mydict[float(row[0])] = float(row[1])
+                    if len(row) > 2 and row[2] != '':
+                        self.freq_pwr[float(row[0])] = float(row[2])
+                    if len(row) > 3 and row[3] != '':
+                        self.freq_recal_pwr[float(row[0])] = float(row[3])
             return mydict
         except:
             return None
@@ -359,18 +718,87 @@ class FreqSweep():
         self.sa.write("INIT:IMM;*WAI")
         time.sleep(5)
         try:
-            self.sa.query_ascii_values(':TRAC:DATA? TRACE1')
+            return self.sa.query_ascii_values(':TRAC:DATA? TRACE1')
         except:
             print("ERROR: Gettting spectrum analyzer trace data failed! Please check command correctness and try an again.")
-            pass
+            return None
+
+    def analyzer_step_sweep(self, initial_freq = 66, step_freq = 11, steps = 32, freq_unit = 'MHz', averaging = True,
+                            delay = 5, meas_pwr_delay = 10, file_name = 'test1.csv'):
+        #Steps the center frequency of the spectrum analyzer and measures the power at the center marker
+        #(no signal generator, formerly pyvisa_freq_sweep.py)
+        power_unit = 'dBm'
+        to_ghz = {'GHz': 1, 'MHz': 1e-3, 'kHz': 1e-6}[freq_unit]
+
+        #set the center frequency and the center frequency step
+        self.sa.write(':FREQ:CENT '+ str(initial_freq) + ' ' + freq_unit)
+        self.sa.write(':FREQ:CENT:STEP '+ str(step_freq) + ' ' + freq_unit)
+
+        #set the number of average if averaging is on
+        if averaging:
+            self.sa.write('AVER ON')
+            self.sa.write('AVER:COUN 10')
+        else:
+            self.sa.write('AVER OFF')
+        time.sleep(3)
+
+        with open(file_name, 'w', newline = '') as csvfile:
+            csvwriter = csv.writer(csvfile, delimiter = ',', quotechar = '|')
+            csvwriter.writerow(['STEP', 'FREQ', 'MEAS_PWR'])
+
+            for i in range(steps):
+                curr_freq = initial_freq + i * step_freq
+                #set the marker at the center frequency
+                self.sa.write('CALC:MARK:CENT')
+                time.sleep(delay)
+
+                #calcualte the Y-coordinate of the center frequency (measure the peak power)
+                self.sa.write('CALC:MARK:Y?')
+                time.sleep(meas_pwr_delay)
+
+                meas_pwr = float(self.sa.read())
+                #Stdout current frequency, number of steps, and measured power
+                print("Current Frequency: " + str(curr_freq) + freq_unit + ' , Step: ' + str(i) + ' , Measured Power: ' + str(meas_pwr) + ' ' + power_unit)
+
+                csvwriter.writerow([i + 1, curr_freq, meas_pwr])
+                self.publish_measurement(curr_freq * to_ghz, None, meas_pwr)
+
+                #increment the frequency by step
+                self.sa.write('FREQ:CENT UP')
+                time.sleep(delay)
+        print("Success: Frequency sweep ends.")
+        return
+
+    def start_live_stream(self, name = 'freq_sweep', num_slots = 256, trace_points = 1001):
+        #Publishes every measurement and trace into a shared memory ring buffer (consumers: result_stream.ResultSubscriber)
+        import result_stream    #requires Python 3.8 or newer, only imported when the live stream is used
+        self.stream = result_stream.ResultStream(name, num_slots, trace_points)
+        print("Live result stream started: " + name)
+
+    def stop_live_stream(self):
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+
+    def publish_measurement(self, freq, volt, pwr, product = 0):
+        if self.stream is not None:
+            self.stream.publish_measurement(freq, volt, pwr, product)
+
+    def publish_trace(self, freq, trace_data):
+        if self.stream is not None:
+            self.stream.publish_trace(freq, trace_data)
 
 if __name__ == '__main__':
     #Parameters: start frequency, end frequency, mixer multiplier(1/3/18), version(0/1/2), spectrum analyzer center frequency (GHz), Frequency Step, 
     #Screenshot? (True/False), Save Trace Data? (True/False)
     FS = FreqSweep(65, 160, 1, 1, 0.047, 5, False, False)
     FS.initialize_instrument()
+    #FS.start_live_stream('freq_sweep')
     #FS.biasing_calibration()
     #FS.freq_sweep_test()
     #FS.frequency_sweep()
+    #FS.multi_product_sweep()
+    #FS.analyzer_step_sweep()
     FS.fluctuation_test()
+    FS.stop_live_stream()
     sys.exit(0)
\ No newline at end of file
@@ -0,0 +1,148 @@
+# coding: utf-8
+
+'''
+Live result stream for the frequency sweep programs.
+
+The sweep (single writer) publishes every measurement and spectrum analyzer trace into a ring buffer
+in shared memory. Monitors and live plotters on the same computer attach to the buffer by name and
+read the results without locks and without slowing down the measurement loop.
+
+Buffer layout:
+    header: number of published records, number of slots, trace points per slot
+    slot:   sequence number, kind, product, number of trace points, number of points of the original trace,
+            frequency, voltage, power, trace points
+
+freq is always the test frequency. product is 0 for the single product of the tests; the multi product
+sweep publishes one record per product with product = position (1, 2, ...) of the product in its list.
+
+Traces longer than the trace points of a slot are cut to fit; record.total_points holds the length of
+the original trace so that a plotter can tell that the trace was cut (total_points > len(record.trace)).
+
+Each slot has a sequence number: it is odd while the writer is filling the slot and 2 * (index + 1)
+once record <index> is complete. A reader checks the sequence number, copies the slot (including the
+trace points) out of the shared memory and checks the sequence number again; if the writer started to
+overwrite the slot meanwhile, the record is dropped (counted in ResultSubscriber.dropped). Records
+returned by poll() are therefore complete copies: they stay valid after the writer wraps around the
+ring buffer and do not keep the shared memory from being closed. The trace of a MEASUREMENT record
+is an empty tuple.
+
+Only the writer removes the shared memory (ResultStream.close). Subscribers detach from the resource
+tracker of their process, otherwise the tracker would remove the writer's buffer when a monitor exits.
+
+Usage (consumer side):
+    sub = ResultSubscriber('freq_sweep')
+    while True:
+        for record in sub.poll():
+            print(record.freq, record.pwr)
+        time.sleep(0.5)
+'''
+
+import os
+import sys
+import struct
+import collections
+from multiprocessing import shared_memory   #Python 3.8 or newer is REQUIRED for the live result stream
+
+MEASUREMENT = 1     #single power measurement (frequency, voltage, power)
+TRACE = 2           #spectrum analyzer trace data
+
+_HEADER = struct.Struct('<QII')
+_SLOT_HEADER = struct.Struct('<QIIIIddd')
+
+StreamRecord = collections.namedtuple('StreamRecord', ['index', 'kind', 'freq', 'volt', 'pwr', 'trace', 'total_points', 'product'])
+
+
+def _slot_size(trace_points):
+    return _SLOT_HEADER.size + 8 * trace_points
+
+
+class ResultStream():
+    #Writer side of the ring buffer. Only one process (the sweep) may publish into a stream.
+    def __init__(self, name, num_slots = 256, trace_points = 1001):
+        self.name = name
+        self.num_slots = num_slots
+        self.trace_points = trace_points    #1001 points is the default sweep length of the spectrum analyzer
+        self.slot_size = _slot_size(trace_points)
+        self.count = 0
+
+        self.shm = shared_memory.SharedMemory(name = name, create = True, size = _HEADER.size + num_slots * self.slot_size)
+        _HEADER.pack_into(self.shm.buf, 0, 0, num_slots, trace_points)
+
+    def publish_measurement(self, freq, volt, pwr, product = 0):
+        self._publish(MEASUREMENT, freq, volt, pwr, (), product)
+
+    def publish_trace(self, freq, trace_data):
+        self._publish(TRACE, freq, float('nan'), float('nan'), trace_data, 0)
+
+    def _publish(self, kind, freq, volt, pwr, trace_data, product):
+        n_points = min(len(trace_data), self.trace_points)
+        offset = _HEADER.size + (self.count % self.num_slots) * self.slot_size
+
+        #mark the slot as being written, fill it, then mark it as complete
+        struct.pack_into('<Q', self.shm.buf, offset, 2 * self.count + 1)
+        _SLOT_HEADER.pack_into(self.shm.buf, offset, 2 * self.count + 1, kind, product, n_points, len(trace_data),
+                               float(freq), float('nan') if volt is None else float(volt), float(pwr))
+        if n_points:
+            struct.pack_into('<%dd' % n_points, self.shm.buf, offset + _SLOT_HEADER.size, *trace_data[:n_points])
+        struct.pack_into('<Q', self.shm.buf, offset, 2 * self.count + 2)
+
+        self.count += 1
+        struct.pack_into('<Q', self.shm.buf, 0, self.count)
+
+    def close(self):
+        #removes the shared memory block, subscribers still attached keep their mapping until they close
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            #already removed (e.g. by the resource tracker of a subscriber of an older version)
+            pass
+
+
+class ResultSubscriber():
+    #Reader side of the ring buffer. Any number of subscribers can attach to the same stream.
+    def __init__(self, name):
+        if sys.version_info >= (3, 13):
+            self.shm = shared_memory.SharedMemory(name = name, track = False)
+        else:
+            self.shm = shared_memory.SharedMemory(name = name)
+            if os.name == 'posix':
+                #attaching registers the buffer with the resource tracker, which would remove it when this process exits
+                from multiprocessing import resource_tracker
+                resource_tracker.unregister(self.shm._name, 'shared_memory')
+        count, self.num_slots, self.trace_points = _HEADER.unpack_from(self.shm.buf, 0)
+        self.slot_size = _slot_size(self.trace_points)
+        self.next_index = 0
+        self.dropped = 0    #records overwritten before they were read
+
+    def poll(self):
+        #returns the records published since the last poll (oldest first)
+        count = struct.unpack_from('<Q', self.shm.buf, 0)[0]
+        if count - self.next_index > self.num_slots:
+            self.dropped += count - self.num_slots - self.next_index
+            self.next_index = count - self.num_slots
+
+        records = []
+        while self.next_index < count:
+            record = self._read_slot(self.next_index)
+            if record is None:
+                self.dropped += 1
+            else:
+                records.append(record)
+            self.next_index += 1
+        return records
+
+    def _read_slot(self, index):
+        offset = _HEADER.size + (index % self.num_slots) * self.slot_size
+        seq, kind, product, n_points, total_points, freq, volt, pwr = _SLOT_HEADER.unpack_from(self.shm.buf, offset)
+        if seq != 2 * index + 2:
+            return None
+        #copy the trace points, then check that the writer did not touch the slot while copying
+        n_points = min(n_points, self.trace_points)     #header may be torn if the writer is overwriting the slot
+        trace = struct.unpack_from('<%dd' % n_points, self.shm.buf, offset + _SLOT_HEADER.size) if n_points else ()
+        if struct.unpack_from('<Q', self.shm.buf, offset)[0] != seq:
+            return None
+        return StreamRecord(index, kind, freq, volt, pwr, trace, total_points, product)
+
+    def close(self):
+        self.shm.close()
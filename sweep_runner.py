@@ -0,0 +1,271 @@
+# coding: utf-8
+
+'''
+Command line runner for the frequency sweep tests of frequency_sweep.py.
+
+Executes a run plan (JSON file) as a queue of jobs back-to-back, without pauses between the jobs,
+so that calibration, sweeps and fluctuation tests can run overnight without anyone at the bench.
+pyvisa is only imported when the instruments are connected, so checking a plan (--dry-run) is instant.
+
+Usage:
+    python sweep_runner.py plan.json            run all jobs of the plan
+    python sweep_runner.py plan.json --dry-run  check the plan and print the job queue only
+
+Run plan example:
+{
+    "sweep": {"freq_start": 65, "freq_end": 160, "multiplier": 1, "version": 0, "sa_cent_freq": 0.047,
+              "freq_step": 5, "do_screenshot": false, "save_trace_data": false},
+    "vmap_file": "freq_volt_map.csv",
+    "live_stream": "freq_sweep",
+    "jobs": [
+        {"run": "biasing_calibration", "output": "data_calibration.csv"},
+        {"run": "frequency_sweep", "output": "data_sweep.csv", "params": {"incremental_recal": true}},
+        {"run": "fluctuation_test", "output": "data_fluctuation.csv", "sweep": {"freq_end": 65}, "params": {"num_meas": 200}}
+    ]
+}
+
+"sweep" holds the FreqSweep parameters, a job can override some of them with its own "sweep" entry
+(except "version": the instruments are connected once for the whole plan).
+"params" are passed to the test function, "output" is the data file of the job.
+"vmap_file" (freq->volt map of the calibration), "live_stream" (name of the live result stream) and
+"volt_protection" (over voltage protection of the voltage source in Volts) are optional.
+The values of the parameters are checked and the FreqSweep of every job is built before anything runs.
+
+Plans replacing the retired scripts:
+    pyvisa_freq_sweep.py (spectrum analyzer only, version 2):
+        {"run": "analyzer_step_sweep", "output": "test1.csv",
+         "params": {"initial_freq": 66, "step_freq": 11, "steps": 32, "freq_unit": "MHz"}}
+    pyvisa_mixer_freq_sweep.py (version 0, "sweep": {"freq_start": 140, "freq_end": 200, "multiplier": 3, "sa_cent_freq": 0.065, ...},
+    "volt_protection": 0.5):
+        {"run": "biasing_calibration", "params": {"initial_voltage": 0.05, "volt_steps": 30, "volt_step": 0.01}},
+        {"run": "frequency_sweep", "output": "test_data.csv"}
+'''
+
+import sys
+import json
+import numbers
+import inspect
+import argparse
+import datetime
+
+import frequency_sweep
+
+#test functions of FreqSweep that can be queued in a run plan
+JOBS = ['biasing_calibration', 'freq_sweep_test', 'frequency_sweep', 'multi_product_sweep', 'fluctuation_test', 'analyzer_step_sweep']
+
+#instrument versions (see frequency_sweep.py) providing the instruments needed by the test functions
+JOB_VERSIONS = {'biasing_calibration': [0], 'frequency_sweep': [0], 'freq_sweep_test': [0, 1],
+                'multi_product_sweep': [0, 1], 'fluctuation_test': [0, 1], 'analyzer_step_sweep': [0, 1, 2]}
+
+SWEEP_PARAMS = ['freq_start', 'freq_end', 'multiplier', 'version', 'sa_cent_freq', 'freq_step', 'do_screenshot', 'save_trace_data']
+
+#parameters of the test functions which have to be positive numbers
+POSITIVE_PARAMS = ['num_meas', 'steps', 'volt_steps', 'volt_step', 'initial_voltage', 'step_freq', 'group_span']
+
+
+def is_number(value):
+    return isinstance(value, numbers.Real) and not isinstance(value, bool)
+
+
+def load_plan(file_path):
+    try:
+        with open(file_path) as plan_file:
+            return json.load(plan_file)
+    except (IOError, ValueError) as e:
+        print('ERROR: Reading run plan ' + file_path + ' failed! ' + str(e))
+        sys.exit(1)
+
+
+def check_plan(plan):
+    #returns the list of errors found in the plan (empty if the plan can be run)
+    errors = []
+    if not isinstance(plan, dict):
+        return ['Run plan has to be a JSON object']
+    if not isinstance(plan.get('jobs'), list) or len(plan['jobs']) == 0:
+        return ['Run plan has no jobs']
+    if not isinstance(plan.get('sweep', {}), dict):
+        return ['"sweep" of the run plan has to be a JSON object']
+    if 'volt_protection' in plan and not (is_number(plan['volt_protection']) and 0 < plan['volt_protection'] <= 0.65):
+        errors.append('volt_protection has to be a number between 0 and 0.65 (Volts)')
+
+    for i, job in enumerate(plan['jobs'], 1):
+        name = 'Job ' + str(i)
+        if not isinstance(job, dict):
+            errors.append(name + ': has to be a JSON object')
+            continue
+        bad_types = [key for key in ['sweep', 'params'] if not isinstance(job.get(key, {}), dict)]
+        if bad_types:
+            errors.append(name + ': ' + ', '.join(bad_types) + ' has to be a JSON object')
+            continue
+        if 'version' in job.get('sweep', {}):
+            errors.append(name + ': version cannot be changed per job (instruments are connected once for the whole plan)')
+        if job.get('run') not in JOBS:
+            errors.append(name + ': unknown test function ' + str(job.get('run')) + ' (possible: ' + ', '.join(JOBS) + ')')
+            continue
+
+        sweep = job_sweep(plan, job)
+        missing = [p for p in SWEEP_PARAMS if p not in sweep]
+        unknown = [p for p in sweep if p not in SWEEP_PARAMS]
+        if missing:
+            errors.append(name + ': missing sweep parameters ' + ', '.join(missing))
+        if unknown:
+            errors.append(name + ': unknown sweep parameters ' + ', '.join(unknown))
+        if missing or unknown:
+            continue
+        sweep_errors = check_sweep(sweep)
+        errors += [name + ': ' + error for error in sweep_errors]
+        if not sweep_errors:
+            if sweep['version'] not in JOB_VERSIONS[job['run']]:
+                errors.append(name + ': ' + job['run'] + ' requires instrument version ' + ' or '.join(str(v) for v in JOB_VERSIONS[job['run']]))
+
+            #build the FreqSweep of the job (no instruments are connected)
+            try:
+                frequency_sweep.FreqSweep(**sweep)
+            except Exception as e:
+                errors.append(name + ': sweep parameters are not valid (' + type(e).__name__ + ': ' + str(e) + ')')
+
+        #check the parameters against the signature of the test function
+        signature = inspect.signature(getattr(frequency_sweep.FreqSweep, job['run']))
+        try:
+            signature.bind(None, **job_params(job))
+        except TypeError as e:
+            errors.append(name + ': ' + str(e))
+            continue
+        errors += [name + ': ' + error for error in check_params(signature, job_params(job))]
+    return errors
+
+
+def check_sweep(sweep):
+    #checks the values of the FreqSweep parameters
+    errors = []
+    for key in ['freq_start', 'freq_end', 'multiplier', 'sa_cent_freq', 'freq_step']:
+        if not is_number(sweep[key]):
+            errors.append(key + ' has to be a number')
+    for key in ['do_screenshot', 'save_trace_data']:
+        if not isinstance(sweep[key], bool):
+            errors.append(key + ' has to be true or false')
+    if sweep['version'] not in [0, 1, 2] or isinstance(sweep['version'], bool):
+        errors.append('version has to be 0, 1 or 2')
+    if errors:
+        return errors
+    if sweep['freq_step'] <= 0:
+        errors.append('freq_step has to be positive')
+    if sweep['multiplier'] <= 0:
+        errors.append('multiplier has to be positive')
+    if sweep['freq_end'] < sweep['freq_start']:
+        errors.append('freq_end has to be at least freq_start')
+    return errors
+
+
+def check_params(signature, params):
+    #checks the values of the test function parameters against the types of their defaults
+    errors = []
+    for key, value in params.items():
+        default = signature.parameters[key].default
+        if key == 'products':
+            errors += check_products(value)
+        elif isinstance(default, bool):
+            if not isinstance(value, bool):
+                errors.append(key + ' has to be true or false')
+        elif isinstance(default, numbers.Integral):
+            if not isinstance(value, numbers.Integral) or isinstance(value, bool):
+                errors.append(key + ' has to be an integer')
+        elif isinstance(default, numbers.Real):
+            if not is_number(value):
+                errors.append(key + ' has to be a number')
+        elif isinstance(default, str):
+            if not isinstance(value, str):
+                errors.append(key + ' has to be a string')
+        if key in POSITIVE_PARAMS and is_number(value) and value <= 0:
+            errors.append(key + ' has to be positive')
+    if params.get('freq_unit', 'MHz') not in ['GHz', 'MHz', 'kHz']:
+        errors.append('freq_unit has to be GHz, MHz or kHz')
+    return errors
+
+
+def check_products(products):
+    #products of multi_product_sweep: list of 1 to 12 [k, n] or [label, k, n]
+    if products is None:
+        return []
+    if not isinstance(products, list) or not 0 < len(products) <= 12:
+        return ['products has to be a list of 1 to 12 products']
+    errors = []
+    for p in products:
+        if not isinstance(p, list) or len(p) not in [2, 3] or (len(p) == 3 and not isinstance(p[0], str)) \
+                or not all(isinstance(x, numbers.Integral) and not isinstance(x, bool) for x in p[-2:]):
+            errors.append('product ' + json.dumps(p) + ' has to be [k, n] or [label, k, n] (k, n: integers)')
+    return errors
+
+
+def job_sweep(plan, job):
+    sweep = dict(plan.get('sweep', {}))
+    sweep.update(job.get('sweep', {}))
+    return sweep
+
+
+def job_params(job):
+    params = dict(job.get('params', {}))
+    if 'output' in job:
+        params['file_name'] = job['output']
+    return params
+
+
+def run_plan(plan):
+    FS = None
+    try:
+        for i, job in enumerate(plan['jobs'], 1):
+            print(str(datetime.datetime.now()) + ' Job ' + str(i) + '/' + str(len(plan['jobs'])) + ': ' + job['run'])
+            FS = make_sweep(plan, job, FS)
+            getattr(FS, job['run'])(**job_params(job))
+    finally:
+        #leave the bench in a safe state, also when a job fails
+        if FS is not None:
+            if FS.vs is not None:
+                FS.vs.write('VOLT 0')
+            FS.stop_live_stream()
+    print(str(datetime.datetime.now()) + ' All jobs done!')
+
+
+def make_sweep(plan, job, prev):
+    #creates the FreqSweep of a job, the instruments, calibration and live stream are kept from the previous job
+    FS = frequency_sweep.FreqSweep(**job_sweep(plan, job))
+    FS.vmap_file = plan.get('vmap_file', FS.vmap_file)
+    FS.volt_protection = plan.get('volt_protection')
+    if prev is None:
+        FS.initialize_instrument()
+        if plan.get('live_stream'):
+            FS.start_live_stream(plan['live_stream'])
+    else:
+        FS.rm, FS.vs, FS.sg, FS.sa = prev.rm, prev.vs, prev.sg, prev.sa
+        FS.freq_volt, FS.freq_pwr, FS.is_calibrated = prev.freq_volt, prev.freq_pwr, prev.is_calibrated
+        FS.freq_recal_pwr = prev.freq_recal_pwr
+        FS.stream = prev.stream
+    return FS
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Run a queue of frequency sweep jobs from a run plan.')
+    parser.add_argument('plan', help = 'run plan (JSON file)')
+    parser.add_argument('--dry-run', action = 'store_true', help = 'check the plan and print the job queue without connecting to the instruments')
+    args = parser.parse_args(argv)
+
+    plan = load_plan(args.plan)
+    errors = check_plan(plan)
+    if errors:
+        print('ERROR: Run plan ' + args.plan + ' is not valid!')
+        for error in errors:
+            print('    ' + error)
+        sys.exit(1)
+
+    for i, job in enumerate(plan['jobs'], 1):
+        print('Job ' + str(i) + ': ' + job['run'] + ' ' + str(job_params(job)) + ' sweep: ' + str(job_sweep(plan, job)))
+    if args.dry_run:
+        print('Run plan is valid (dry run, no instruments connected).')
+        return
+
+    run_plan(plan)
+
+
+if __name__ == '__main__':
+    main()
+    sys.exit(0)